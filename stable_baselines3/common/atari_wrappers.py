@@ -13,7 +13,7 @@ from stable_baselines3.common.type_aliases import GymObs, GymStepReturn
 
 
 class NoopResetEnv(gym.Wrapper):
-    def __init__(self, env: gym.Env, noop_max: int = 30, override_num_noops: int = None):
+    def __init__(self, env: gym.Env, noop_max: int = 30, override_num_noops: int = None, action_meanings: list = None):
         """
         Sample initial states by taking random number of no-ops on reset.
         No-op is assumed to be action 0.
@@ -21,12 +21,16 @@ class NoopResetEnv(gym.Wrapper):
         :param env: the environment to wrap
         :param noop_max: the maximum value of no-ops to run
         :param override_num_noops: the number of fixed no-ops
+        :param action_meanings: precomputed ``env.unwrapped.get_action_meanings()``,
+            to avoid walking the wrapper chain again
         """
         gym.Wrapper.__init__(self, env)
         self.noop_max = noop_max
         self.override_num_noops = override_num_noops
         self.noop_action = 0
-        assert env.unwrapped.get_action_meanings()[0] == "NOOP"
+        if action_meanings is None:
+            action_meanings = env.unwrapped.get_action_meanings()
+        assert action_meanings[0] == "NOOP"
 
     def reset(self, **kwargs) -> np.ndarray:
         self.env.reset(**kwargs)
@@ -35,24 +39,31 @@ class NoopResetEnv(gym.Wrapper):
         else:
             noops = self.unwrapped.np_random.randint(1, self.noop_max + 1)
         assert noops > 0
-        obs = np.zeros(0)
-        for _ in range(noops):
-            obs, _, done, _ = self.env.step(self.noop_action)
+        # intermediate observations are discarded, only keep the last one
+        for _ in range(noops - 1):
+            _, _, done, _ = self.env.step(self.noop_action)
             if done:
-                obs = self.env.reset(**kwargs)
+                self.env.reset(**kwargs)
+        obs, _, done, _ = self.env.step(self.noop_action)
+        if done:
+            obs = self.env.reset(**kwargs)
         return obs
 
 
 class FireResetEnv(gym.Wrapper):
-    def __init__(self, env: gym.Env):
+    def __init__(self, env: gym.Env, action_meanings: list = None):
         """
         Take action on reset for environments that are fixed until firing.
 
         :param env: the environment to wrap
+        :param action_meanings: precomputed ``env.unwrapped.get_action_meanings()``,
+            to avoid walking the wrapper chain again
         """
         gym.Wrapper.__init__(self, env)
-        assert env.unwrapped.get_action_meanings()[1] == "FIRE"
-        assert len(env.unwrapped.get_action_meanings()) >= 3
+        if action_meanings is None:
+            action_meanings = env.unwrapped.get_action_meanings()
+        assert action_meanings[1] == "FIRE"
+        assert len(action_meanings) >= 3
 
     def reset(self, **kwargs) -> np.ndarray:
         self.env.reset(**kwargs)
@@ -76,13 +87,16 @@ class EpisodicLifeEnv(gym.Wrapper):
         gym.Wrapper.__init__(self, env)
         self.lives = 0
         self.was_real_done = True
+        # cache the bound method to avoid walking the wrapper chain
+        # (env.unwrapped) on every step
+        self._get_lives = env.unwrapped.ale.lives
 
     def step(self, action: int) -> GymStepReturn:
         obs, reward, done, info = self.env.step(action)
         self.was_real_done = done
         # check current lives, make loss of life terminal,
         # then update lives to handle bonus lives
-        lives = self.env.unwrapped.ale.lives()
+        lives = self._get_lives()
         if 0 < lives < self.lives:
             # for Qbert sometimes we stay in lives == 0 condtion for a few frames
             # so its important to keep lives > 0, so that we only reset once
@@ -105,7 +119,7 @@ class EpisodicLifeEnv(gym.Wrapper):
         else:
             # no-op step to advance from terminal/lost life state
             obs, _, _, _ = self.env.step(0)
-        self.lives = self.env.unwrapped.ale.lives()
+        self.lives = self._get_lives()
         return obs
 
 
@@ -114,13 +128,23 @@ class MaxAndSkipEnv(gym.Wrapper):
         """
         Return only every ``skip``-th frame (frameskipping)
 
+        The returned observation references an internal buffer that is
+        overwritten in-place by the next ``step()`` call; copy it if it
+        must be kept across steps (SB3 vec envs and buffers copy
+        observations on ingestion and are not affected).
+
         :param env: the environment
         :param skip: number of ``skip``-th frame
         """
         gym.Wrapper.__init__(self, env)
-        # most recent raw observations (for max pooling across time steps)
-        self._obs_buffer = np.zeros((2,) + env.observation_space.shape, dtype=env.observation_space.dtype)
+        # running max over the most recent raw observations,
+        # updated in-place to avoid a per-step reduction allocation
+        self._max_buffer = np.zeros(env.observation_space.shape, dtype=env.observation_space.dtype)
         self._skip = skip
+        # whether the env reuses its observation buffer between steps, in which
+        # case the second-to-last frame must be copied before the next step
+        # (probed once on the first full skip window)
+        self._copy_frames = None
 
     def step(self, action: int) -> GymStepReturn:
         """
@@ -128,24 +152,39 @@ class MaxAndSkipEnv(gym.Wrapper):
         Repeat action, sum reward, and max over last observations.
 
         :param action: the action
-        :return: observation, reward, done, information
+        :return: observation (only valid until the next ``step()`` call), reward, done, information
         """
         total_reward = 0.0
         done = None
+        second_last_obs = None
         for i in range(self._skip):
             obs, reward, done, info = self.env.step(action)
             if i == self._skip - 2:
-                self._obs_buffer[0] = obs
-            if i == self._skip - 1:
-                self._obs_buffer[1] = obs
+                # keep a reference; most envs return a fresh array every step,
+                # so copying the frame is only needed when they do not
+                second_last_obs = obs
+                if self._copy_frames is not False:
+                    np.copyto(self._max_buffer, obs)
             total_reward += reward
             if done:
                 break
         # Note that the observation on the done=True frame
         # doesn't matter
-        max_frame = self._obs_buffer.max(axis=0)
+        if second_last_obs is None:
+            # episode ended before the two pooled frames (or skip == 1):
+            # only the most recent frame is available
+            np.copyto(self._max_buffer, obs)
+        else:
+            if self._copy_frames is None and i == self._skip - 1:
+                # one-time probe: an env that reuses its observation buffer
+                # aliases the two frames, so the copying path must be kept
+                self._copy_frames = bool(np.shares_memory(second_last_obs, obs))
+            if self._copy_frames is not False:
+                np.maximum(self._max_buffer, obs, out=self._max_buffer)
+            else:
+                np.maximum(second_last_obs, obs, out=self._max_buffer)
 
-        return max_frame, total_reward, done, info
+        return self._max_buffer, total_reward, done, info
 
     def reset(self, **kwargs) -> GymObs:
         return self.env.reset(**kwargs)
@@ -167,7 +206,10 @@ class ClipRewardEnv(gym.RewardWrapper):
         :param reward:
         :return:
         """
-        return np.sign(reward)
+        # equivalent to np.sign(reward) without the scalar ufunc dispatch overhead
+        # (the float() calls also keep numpy scalar rewards from producing
+        # np.bool_ operands, whose subtraction numpy forbids)
+        return float(reward > 0) - float(reward < 0)
 
 
 class WarpFrame(gym.ObservationWrapper):
@@ -176,31 +218,61 @@ class WarpFrame(gym.ObservationWrapper):
         Convert to grayscale and warp frames to 84x84 (default)
         as done in the Nature paper and later work.
 
+        Frames are kept as uint8 all the way through the wrapper stack and the
+        buffers; scaling to float (``x / 255``) is deferred to the model
+        preprocessing (see ``common.preprocessing.preprocess_obs``) where it
+        runs on the training device and only on sampled batches.
+
+        The returned observation is a view on an internal buffer reused
+        between steps; copy it if it must outlive the next call (SB3 vec
+        envs and buffers copy observations on ingestion and are not
+        affected).
+
         :param env: the environment
         :param width:
         :param height:
         :param region: the 2-tuple of slices specifying region to be cropped, top-left and bottom-right coordinates
         """
         gym.ObservationWrapper.__init__(self, env)
+        assert env.observation_space.dtype == np.uint8, "WarpFrame requires a uint8 observation space"
         self.width = width
         self.height = height
         self.region = region
         self.observation_space = spaces.Box(
             low=0, high=255, shape=(self.height, self.width, 1), dtype=env.observation_space.dtype
         )
-
-    def observation(self, frame: np.ndarray) -> np.ndarray:
+        # preallocated buffers, written in-place by cv2 (dst=) on every step
+        self._gray = np.empty((self.height, self.width), dtype=env.observation_space.dtype)
+        self._out = self._gray[:, :, None]
+        self._resized_color = np.empty((self.height, self.width, 3), dtype=env.observation_space.dtype)
+        # sized lazily from the source frame (only needed when upscaling)
+        self._pre_resize_gray = None
+        # specialize on the crop configuration once, so the per-step path
+        # does not re-check ``region``
+        self.observation = self._observation_cropped if region else self._observation_full
+
+    def _observation_cropped(self, frame: np.ndarray) -> np.ndarray:
+        return self._observation_full(frame[self.region])
+
+    def _observation_full(self, frame: np.ndarray) -> np.ndarray:
         """
         returns the current observation from a frame
 
         :param frame: environment frame
         :return: the observation
         """
-        if self.region:
-            frame = frame[self.region]
-        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
-        frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
-        return frame[:, :, None]
+        src_height, src_width = frame.shape[:2]
+        if src_height * src_width > self.height * self.width:
+            # downscaling: resize the color frame first so that the grayscale
+            # conversion only touches the (smaller) target resolution
+            cv2.resize(frame, (self.width, self.height), dst=self._resized_color, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(self._resized_color, cv2.COLOR_RGB2GRAY, dst=self._gray)
+        else:
+            if self._pre_resize_gray is None or self._pre_resize_gray.shape != (src_height, src_width):
+                self._pre_resize_gray = np.empty((src_height, src_width), dtype=self._gray.dtype)
+            cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._pre_resize_gray)
+            cv2.resize(self._pre_resize_gray, (self.width, self.height), dst=self._gray, interpolation=cv2.INTER_AREA)
+        return self._out
 
 
 class AtariWrapper(gym.Wrapper):
@@ -237,12 +309,14 @@ class AtariWrapper(gym.Wrapper):
         terminal_on_life_loss: bool = True,
         clip_reward: bool = True,
     ):
-        env = NoopResetEnv(env, noop_max=noop_max, override_num_noops=override_num_noops)
+        # fetch the action meanings once and share them with the sub-wrappers
+        action_meanings = env.unwrapped.get_action_meanings()
+        env = NoopResetEnv(env, noop_max=noop_max, override_num_noops=override_num_noops, action_meanings=action_meanings)
         env = MaxAndSkipEnv(env, skip=frame_skip)
         if terminal_on_life_loss:
             env = EpisodicLifeEnv(env)
-        if "FIRE" in env.unwrapped.get_action_meanings():
-            env = FireResetEnv(env)
+        if "FIRE" in action_meanings:
+            env = FireResetEnv(env, action_meanings=action_meanings)
         env = WarpFrame(env, width=screen_size, height=screen_size, region=region)
         if clip_reward:
             env = ClipRewardEnv(env)
@@ -11,6 +11,7 @@ from stable_baselines3.common.vec_env.vec_frame_stack import VecFrameStack
 from stable_baselines3.common.vec_env.vec_normalize import VecNormalize
 from stable_baselines3.common.vec_env.vec_transpose import VecTransposeImage
 from stable_baselines3.common.vec_env.vec_video_recorder import VecVideoRecorder
+from stable_baselines3.common.vec_env.vec_warp_frame import VecWarpFrame
 
 # Avoid circular import
 if typing.TYPE_CHECKING:
@@ -0,0 +1,73 @@
+import numpy as np
+from gym import spaces
+
+try:
+    import cv2  # pytype:disable=import-error
+
+    cv2.ocl.setUseOpenCL(False)
+except ImportError:
+    cv2 = None
+
+from stable_baselines3.common.preprocessing import is_image_space
+from stable_baselines3.common.vec_env.base_vec_env import VecEnv, VecEnvStepReturn, VecEnvWrapper
+
+
+class VecWarpFrame(VecEnvWrapper):
+    """
+    Convert a batch of color frames to grayscale and resize them to a square image,
+    as done by ``common.atari_wrappers.WarpFrame`` but for a vectorized environment.
+    Processing the whole batch at once amortizes the per-call overhead over the
+    environments and allows writing every frame into a single preallocated
+    scratch tensor (one allocation per step instead of one per env).
+
+    :param venv: the vectorized environment to wrap
+    :param width: the width of the resized frame
+    :param height: the height of the resized frame
+    """
+
+    def __init__(self, venv: VecEnv, width: int = 84, height: int = 84):
+        assert is_image_space(venv.observation_space), "The observation space must be an image"
+        assert venv.observation_space.shape[-1] == 3, "VecWarpFrame requires RGB (channel-last) observations"
+        self.width = width
+        self.height = height
+        observation_space = spaces.Box(low=0, high=255, shape=(self.height, self.width, 1), dtype=venv.observation_space.dtype)
+        super(VecWarpFrame, self).__init__(venv, observation_space=observation_space)
+        # preallocated scratch batch for the cv2 calls, copied on return:
+        # step_wait() hands ownership of the observations to the caller
+        self._out = np.empty((venv.num_envs, self.height, self.width, 1), dtype=observation_space.dtype)
+
+    def warp(self, observations: np.ndarray) -> np.ndarray:
+        """
+        Convert a ``(num_envs, height, width, 3)`` batch of frames to grayscale
+        and resize it into the preallocated output tensor.
+
+        :param observations: batch of RGB frames
+        :return: batch of warped frames, of shape ``(num_envs, height, width, 1)``
+        """
+        src_height, src_width = observations.shape[1:3]
+        # when downscaling, resize the color frame first so that the grayscale
+        # conversion only touches the (smaller) target resolution
+        downscale = src_height * src_width > self.height * self.width
+        for env_idx in range(self.num_envs):
+            frame = observations[env_idx]
+            if downscale:
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+                cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY, dst=self._out[env_idx, :, :, 0])
+            else:
+                frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+                cv2.resize(frame, (self.width, self.height), dst=self._out[env_idx, :, :, 0], interpolation=cv2.INTER_AREA)
+        # return a copy, the scratch buffer is overwritten on the next step
+        return self._out.copy()
+
+    def step_wait(self) -> VecEnvStepReturn:
+        observations, rewards, dones, infos = self.venv.step_wait()
+        return self.warp(observations), rewards, dones, infos
+
+    def reset(self) -> np.ndarray:
+        """
+        Reset all environments
+        """
+        return self.warp(self.venv.reset())
+
+    def close(self) -> None:
+        self.venv.close()
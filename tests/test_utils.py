@@ -7,7 +7,7 @@ import pytest
 import torch as th
 
 from stable_baselines3 import A2C
-from stable_baselines3.common.atari_wrappers import ClipRewardEnv
+from stable_baselines3.common.atari_wrappers import ClipRewardEnv, MaxAndSkipEnv, WarpFrame
 from stable_baselines3.common.env_util import make_atari_env, make_vec_env
 from stable_baselines3.common.evaluation import evaluate_policy
 from stable_baselines3.common.monitor import Monitor
@@ -65,6 +65,124 @@ def test_make_atari_env(env_id, n_envs, wrapper_kwargs):
         assert np.max(np.abs(reward)) < 1.0
 
 
+class ToyFrameEnv(gym.Env):
+    """
+    Env with deterministic frames (odd steps are brighter than even ones),
+    optionally reusing a single observation buffer as some envs do.
+
+    :param reuse_obs_buffer: Return the same ndarray on every step instead of a fresh one
+    :param ep_length: the length of each episode in timesteps
+    """
+
+    def __init__(self, reuse_obs_buffer: bool = False, ep_length: int = 100):
+        self.observation_space = gym.spaces.Box(low=0, high=255, shape=(2, 2), dtype=np.uint8)
+        self.action_space = gym.spaces.Discrete(1)
+        self.reuse_obs_buffer = reuse_obs_buffer
+        self.ep_length = ep_length
+        self.t = 0
+        self._buffer = np.zeros((2, 2), dtype=np.uint8)
+
+    def _frame(self):
+        value = 100 + self.t if self.t % 2 else self.t
+        if self.reuse_obs_buffer:
+            self._buffer.fill(value)
+            return self._buffer
+        return np.full((2, 2), value, dtype=np.uint8)
+
+    def reset(self):
+        self.t = 0
+        return self._frame()
+
+    def step(self, action):
+        self.t += 1
+        return self._frame(), 1.0, self.t >= self.ep_length, {}
+
+
+@pytest.mark.parametrize("reuse_obs_buffer", [False, True])
+def test_max_and_skip_env(reuse_obs_buffer):
+    env = MaxAndSkipEnv(ToyFrameEnv(reuse_obs_buffer=reuse_obs_buffer), skip=4)
+    env.reset()
+    # frames 1..4 are played: the pooled obs is max(frame 3, frame 4) = 103
+    obs, reward, done, _ = env.step(0)
+    assert np.all(obs == 103)
+    assert reward == 4.0
+    assert not done
+    # the probe must have detected whether the env reuses its obs buffer
+    assert env._copy_frames is reuse_obs_buffer
+    # frames 5..8: the pooled obs is max(frame 7, frame 8) = 107
+    obs, _, _, _ = env.step(0)
+    assert np.all(obs == 107)
+
+    # episode ending on the second-to-last frame of the skip window
+    env = MaxAndSkipEnv(ToyFrameEnv(reuse_obs_buffer=reuse_obs_buffer, ep_length=3), skip=4)
+    env.reset()
+    obs, reward, done, _ = env.step(0)
+    assert done
+    assert np.all(obs == 103)
+    assert reward == 3.0
+
+    # episode ending before the two pooled frames
+    env = MaxAndSkipEnv(ToyFrameEnv(reuse_obs_buffer=reuse_obs_buffer, ep_length=1), skip=4)
+    env.reset()
+    obs, reward, done, _ = env.step(0)
+    assert done
+    assert np.all(obs == 101)
+    assert reward == 1.0
+
+
+class ToyImageEnv(gym.Env):
+    """
+    Env returning the same frame on every step, for testing ``WarpFrame``.
+
+    :param frame: the frame returned on every step
+    """
+
+    def __init__(self, frame: np.ndarray):
+        self.frame = frame
+        self.observation_space = gym.spaces.Box(low=0, high=255, shape=frame.shape, dtype=frame.dtype)
+        self.action_space = gym.spaces.Discrete(1)
+
+    def reset(self):
+        return self.frame
+
+    def step(self, action):
+        return self.frame, 0.0, False, {}
+
+
+def test_warp_frame():
+    pytest.importorskip("cv2")
+    # downscaling path: a constant RGB frame stays constant through grayscale + resize
+    frame = np.full((10, 8, 3), 200, dtype=np.uint8)
+    env = WarpFrame(ToyImageEnv(frame), width=4, height=4)
+    assert env.observation_space.shape == (4, 4, 1)
+    obs = env.reset()
+    assert obs.shape == (4, 4, 1)
+    assert obs.dtype == np.uint8
+    assert np.all(obs == 200)
+
+    # cropped path: only the region pixels contribute to the output
+    frame = np.zeros((10, 8, 3), dtype=np.uint8)
+    region = (slice(2, 8), slice(0, 6))
+    frame[region] = 150
+    env = WarpFrame(ToyImageEnv(frame), width=4, height=4, region=region)
+    obs = env.reset()
+    assert np.all(obs == 150)
+
+    # upscaling path: the lazily allocated intermediate buffer is reused between steps
+    frame = np.full((3, 3, 3), 50, dtype=np.uint8)
+    env = WarpFrame(ToyImageEnv(frame), width=8, height=8)
+    obs = env.reset()
+    assert obs.shape == (8, 8, 1)
+    assert np.all(obs == 50)
+    obs, _, _, _ = env.step(0)
+    assert np.all(obs == 50)
+
+    # float observation spaces are rejected
+    float_env = ToyImageEnv(np.full((10, 8, 3), 0.5, dtype=np.float32))
+    with pytest.raises(AssertionError):
+        WarpFrame(float_env)
+
+
 def test_vec_env_kwargs():
     env = make_vec_env("MountainCarContinuous-v0", n_envs=1, seed=0, env_kwargs={"goal_velocity": 0.11})
     assert env.get_attr("goal_velocity")[0] == 0.11
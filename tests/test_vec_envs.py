@@ -415,3 +415,42 @@ def test_framestack_vecenv():
     # Test that it works with non-image envs when no channels_order is given
     vec_env = DummyVecEnv([make_non_image_env for _ in range(N_ENVS)])
     vec_env = VecFrameStack(vec_env, n_stack=2)
+
+
+def test_vec_warp_frame():
+    """Test that VecWarpFrame warps image observations batch-wise"""
+    pytest.importorskip("cv2")
+    from stable_baselines3.common.vec_env import VecWarpFrame
+
+    image_space_shape = [24, 16, 3]
+
+    def make_image_env():
+        return CustomGymEnv(
+            gym.spaces.Box(
+                low=np.zeros(image_space_shape),
+                high=np.ones(image_space_shape) * 255,
+                dtype=np.uint8,
+            )
+        )
+
+    vec_env = DummyVecEnv([make_image_env for _ in range(N_ENVS)])
+    vec_env = VecWarpFrame(vec_env, width=8, height=8)
+    obs = vec_env.reset()
+    assert obs.shape == (N_ENVS, 8, 8, 1)
+    assert obs.dtype == np.uint8
+
+    obs, _, _, _ = vec_env.step(np.zeros([N_ENVS] + image_space_shape))
+    assert obs.shape == (N_ENVS, 8, 8, 1)
+
+    # The returned observations are owned by the caller:
+    # they must not be mutated by subsequent steps
+    previous_obs = obs.copy()
+    next_obs, _, _, _ = vec_env.step(np.zeros([N_ENVS] + image_space_shape))
+    assert next_obs is not obs
+    assert np.array_equal(obs, previous_obs)
+    vec_env.close()
+
+    # Non-image observations are rejected
+    vec_env = DummyVecEnv([lambda: CustomGymEnv(gym.spaces.Box(low=np.zeros((2,)), high=np.ones((2,))))])
+    with pytest.raises(AssertionError):
+        VecWarpFrame(vec_env)